@@ -0,0 +1,55 @@
+"""
+Measure import time and peak memory of lasertag modules, and whether
+they load curses or gym.
+Each target is imported in a fresh interpreter.
+
+    python benchmarks/bench_import.py [--repeat N]
+"""
+import argparse
+import subprocess
+import sys
+
+TARGETS = [
+    ('lasertag.envs.game_implementation', 'import lasertag.envs.game_implementation'),
+    ('lasertag', 'import lasertag'),
+    ('lasertag.envs.lasertag', 'import lasertag.envs.lasertag'),
+    ('lasertag.preload()', 'import lasertag; lasertag.preload()'),
+    # Reference: gym alone, and the documented `import gym; import lasertag`
+    ('gym', 'import gym'),
+    ('gym + lasertag', 'import gym; import lasertag'),
+]
+
+CHILD = """
+import resource, sys, time
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+      int('curses' in sys.modules), int('gym' in sys.modules))
+"""
+
+
+def measure(stmt):
+    out = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', CHILD.format(stmt=stmt)],
+                                  stderr=subprocess.DEVNULL)
+    elapsed, maxrss, curses, gym = out.decode().split()
+    return float(elapsed), int(maxrss), bool(int(curses)), bool(int(gym))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:<38}{:>12}{:>14}{:>8}{:>6}'.format('target', 'best (ms)', 'maxrss (KB)', 'curses', 'gym'))
+    for name, stmt in TARGETS:
+        results = [measure(stmt) for _ in range(args.repeat)]
+        best = min(r[0] for r in results)
+        maxrss = min(r[1] for r in results)
+        curses = any(r[2] for r in results)
+        gym = any(r[3] for r in results)
+        print('{:<38}{:>12.1f}{:>14}{:>8}{:>6}'.format(name, best * 1e3, maxrss, str(curses), str(gym)))
+
+
+if __name__ == '__main__':
+    main()
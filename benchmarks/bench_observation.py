@@ -0,0 +1,102 @@
+"""
+Compare full and incremental observation modes on self-play trajectories.
+Checks that both modes give the same observations, then reports step time
+of both modes and the fraction of full rebuilds avoided.
+
+    python benchmarks/bench_observation.py [--episodes N] [--seed S]
+"""
+import argparse
+import random
+import time
+import warnings
+
+import numpy as np
+
+from lasertag.envs import LaserTag, LaserTag_small2, LaserTag_small3, LaserTag_small4
+from lasertag.envs.game_implementation import Actions
+
+warnings.filterwarnings('ignore')
+
+# Self-play-like action mix: mostly movement, some turning and beaming.
+ACTIONS = [Actions.FORWARD] * 3 + [Actions.STEP_LEFT, Actions.STEP_RIGHT, Actions.BACKWARD,
+                                   Actions.TURN_LEFT, Actions.TURN_RIGHT, Actions.BEAM, Actions.BEAM,
+                                   Actions.STAY]
+
+
+def trajectory(cls, incremental, episodes, seed):
+    """
+    Play seeded episodes, yielding env and observation after reset and every step.
+    Observation building draws no random numbers, so both modes play the same game.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    rng = np.random.RandomState(seed)
+    env = cls(incremental=incremental)
+    for _ in range(episodes):
+        yield env, np.stack(env.reset())
+        done = False
+        while not done:
+            action = rng.choice(len(ACTIONS), 2)
+            obs, _, done, _ = env.step_batched(np.array([ACTIONS[action[0]], ACTIONS[action[1]]]))
+            yield env, obs
+
+
+def check(cls, episodes, seed):
+    """
+    Assert that incremental views equal `make_observation` of the current board,
+    and that observations match the full mode, on every step.
+    Views are compared as ascii, since ' ' and 'P' share a colour.
+    """
+    full = [obs for _, obs in trajectory(cls, False, episodes, seed)]
+    steps = 0
+    for step, (env, obs) in enumerate(trajectory(cls, True, episodes, seed)):
+        for player in (1, 2):
+            expected = env.make_observation(env.board, player)
+            assert np.array_equal(env._views[player]['view'], expected), \
+                "{}: player {} view differs at step {}".format(cls.__name__, player, step)
+        assert np.array_equal(obs, full[step]), \
+            "{}: observation differs from full mode at step {}".format(cls.__name__, step)
+        steps += 1
+    assert steps == len(full)
+
+
+def run(cls, incremental, episodes, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    rng = np.random.RandomState(seed)
+    env = cls(incremental=incremental)
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(episodes):
+        env.reset()
+        done = False
+        while not done:
+            action = rng.choice(len(ACTIONS), 2)
+            _, _, done, _ = env.step_batched(np.array([ACTIONS[action[0]], ACTIONS[action[1]]]))
+            steps += 1
+    elapsed = time.perf_counter() - start
+    return env, elapsed / steps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--episodes', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    envs = (LaserTag, LaserTag_small2, LaserTag_small3, LaserTag_small4)
+    for cls in envs:
+        check(cls, args.episodes, args.seed)
+    print('Incremental observations match full rebuilds on every step.')
+
+    print('{:<18}{:>14}{:>14}{:>10}{:>12}'.format('env', 'full (us)', 'incr (us)', 'speedup', 'avoided'))
+    for cls in envs:
+        _, full = run(cls, False, args.episodes, args.seed)
+        env, incremental = run(cls, True, args.episodes, args.seed)
+        avoided = env.obs_patches / float(env.obs_patches + env.obs_rebuilds)
+        print('{:<18}{:>14.1f}{:>14.1f}{:>10.2f}{:>11.1%}'.format(
+            cls.__name__, full * 1e6, incremental * 1e6, full / incremental, avoided))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,42 @@
-from gym.envs.registration import register
-
-register(
-    id='LaserTag-v0',
-    entry_point='lasertag.envs:LaserTag'
-)
-
-register(
-    id='LaserTag-small2-v0',
-    entry_point='lasertag.envs:LaserTag_small2'
-)
-
-register(
-    id='LaserTag-small3-v0',
-    entry_point='lasertag.envs:LaserTag_small3'
-)
-
-register(
-    id='LaserTag-small4-v0',
-    entry_point='lasertag.envs:LaserTag_small4'
-)
-LEVEL =\
-   ['********************************************',
-    '*F                                F        *',
-    '*            F                             *',
-    '*                       F                  *',
-    '*                         P                *',
-    '*     P         F                          *',
-    '*F                                    F    *',
-    '*                                          *',
-    '*       F                    F             *',
-    '*                 F                        *',
-    '*                                          *',
-    '*F            P                 P          *',
-    '*      P                                   *',
-    '*                                          *',
-    '*               P        P                F*',
-    '*             F                            *',
-    '*                              F           *',
-    '*  F                 F                     *',
-    '*       P                               P  *',
-    '*                       F                  *',
-    '*           F                        F     *',
-    '********************************************']
\ No newline at end of file
+import sys
+
+# Env ids registered with gym, see `register_envs`
+ENV_IDS = {
+    'LaserTag-v0': 'lasertag.envs:LaserTag',
+    'LaserTag-small2-v0': 'lasertag.envs:LaserTag_small2',
+    'LaserTag-small3-v0': 'lasertag.envs:LaserTag_small3',
+    'LaserTag-small4-v0': 'lasertag.envs:LaserTag_small4',
+}
+
+_registered = False
+
+
+def register_envs():
+    """
+    Register LaserTag envs with gym.
+    Installed as a `gym.envs` entry point (see setup.py), so gym calls this when it is imported.
+    """
+    global _registered
+    if _registered:
+        return
+    _registered = True
+
+    from gym.envs.registration import register
+    for env_id, entry_point in ENV_IDS.items():
+        register(id=env_id, entry_point=entry_point)
+
+
+# Importing lasertag itself never imports gym, so that the game core
+# (`lasertag.envs.game_implementation`) stays light. If gym was imported first
+# without the entry point (e.g. running from a source checkout), register now.
+if 'gym' in sys.modules:
+    register_envs()
+
+
+def preload():
+    """
+    Import env modules and build their lookup tables in the current process.
+    Call this in a forkserver parent so that forked workers share them.
+    """
+    from lasertag.envs import lasertag
+    lasertag.preload()
@@ -1 +1,10 @@
-from lasertag.envs.lasertag import LaserTag, LaserTag_small2, LaserTag_small3, LaserTag_small4
+# Env classes are resolved lazily, so that importing the game core
+# (`lasertag.envs.game_implementation`) does not import gym.
+_ENVS = ('LaserTag', 'LaserTag_small2', 'LaserTag_small3', 'LaserTag_small4')
+
+
+def __getattr__(name):
+    if name in _ENVS:
+        from lasertag.envs import lasertag
+        return getattr(lasertag, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -9,7 +9,6 @@ from copy import deepcopy
 
 from pycolab import things as plab_things
 from pycolab.prefab_parts import sprites as prefab_sprites
-from pycolab import human_ui
 from pycolab import ascii_art
 
 NUM_FRAMES = 1000
@@ -62,6 +61,36 @@ COLOURS = {'P': (0, 0, 0),        # Respawn
            ' ': (0, 0, 0),        # Black background  
 }
 
+# Lookup table from ascii code to RGB colour. Built lazily, see `rgb_table`.
+_RGB_TABLE = None
+
+
+def colour_to_rgb(c):
+    """
+    Convert pycolab's COLOURS(0~999) to RGB(0~255)
+    """
+    c = tuple(int(element * 255 / 999) for element in c)
+    return c
+
+
+def rgb_table():
+    """
+    Returns (256, 3) uint8 table mapping ascii code to RGB colour.
+    """
+    global _RGB_TABLE
+    if _RGB_TABLE is None:
+        # Every character that can appear on a board needs a colour:
+        # level art plus sprites ('1', '2') and drapes ('R', 'B', 'r', 'b').
+        board_chars = set(''.join(''.join(level) for level in LEVELS)) | set('12RBrb')
+        missing = board_chars - set(COLOURS)
+        assert not missing, "No colour for board characters {}".format(sorted(missing))
+        table = np.zeros((256, 3), dtype=np.uint8)
+        for key, value in COLOURS.items():
+            table[ord(key)] = colour_to_rgb(value)
+        _RGB_TABLE = table
+    return _RGB_TABLE
+
+
 class Actions(enum.IntEnum):
     """Actions for agent movement."""
     FORWARD = 0
@@ -382,8 +411,13 @@ class LaserDrape(plab_things.Drape):
         self.tagged = {'1': 0, '2': 0}
         self._lasers = []
         self._reward = np.array([0, 0])
+        # Whether player fired / hit the opponent in the last update
+        self.fired = False
+        self.hit = False
     
     def update(self, actions, board, layers, backdrop, things, the_plot):
+        self.fired = False
+        self.hit = False
         if actions is None:
             return
         self._lasers.clear()
@@ -391,6 +425,7 @@ class LaserDrape(plab_things.Drape):
         p_actions = actions[self.player]
         if p_actions != Actions.BEAM:
             return
+        self.fired = True
         ply_y, ply_x = things[self.player].position
         directions = things[self.player].directions
         dy, dx = directions[0], directions[1]
@@ -408,6 +443,7 @@ class LaserDrape(plab_things.Drape):
                 break
             elif layers[opponent][cur_y, cur_x]:
                 self.tagged[opponent] += 1
+                self.hit = True
                 if self.player == '1':
                     reward = np.array([1, 0])
                 else:
@@ -439,6 +475,9 @@ class LaserDrape(plab_things.Drape):
 
 
 def main():
+    # Curses UI is only needed for the demo. Keep it out of module import.
+    from pycolab import human_ui
+
     # Build a game of LaserTag.
     game = make_game()
     
@@ -1,9 +1,9 @@
 import gym
 import numpy as np
 
-from gym import error, spaces, utils
-from gym.utils import seeding
-from lasertag.envs.game_implementation import make_game, COLOURS
+from gym import spaces
+from lasertag.envs.game_implementation import make_game, rgb_table, LEVELS
+from lasertag.envs.stats import EpisodeStats
 
 # MACRO
 NORTH = (-1, 0)
@@ -15,10 +15,58 @@ BACKWARD_VIEW = 2
 WEST_VIEW = 10
 EAST_VIEW = 10
 
+# np.rot90 turns needed to make player's direction face EAST, see `_rotate_obs`
+_ROTATIONS = {NORTH: -1, SOUTH: 1, EAST: 0, WEST: 2}
+
+# Fixed-layout info record returned by `LaserTag.step_batched`.
+# `tag_interval_length` is 0 unless one of the players respawned this step.
+INFO_DTYPE = np.dtype([('tag_interval_length', np.int32),
+                       ('respawned', np.bool_, (2,))])
+
+
+# Per-level static layers for incremental observations. Built lazily, see `preload`.
+_STATIC_LAYERS = {}
+
+
+def _static_layers(size):
+    """
+    Returns {direction: (layer, index)} for level `size`.
+    layer: the level's walls and spawn points, rotated for `direction` and padded
+           like `LaserTag._pad_obs`.
+    index: (2, height, width) position of every board cell in `layer`.
+    """
+    layers = _STATIC_LAYERS.get(size)
+    if layers is None:
+        backdrop = np.array([[ord(c) for c in row] for row in LEVELS[size]], dtype=np.uint8)
+        pad_width = ((WEST_VIEW, EAST_VIEW), (BACKWARD_VIEW, FORWARD_VIEW))
+        layers = {}
+        for direction, rot in _ROTATIONS.items():
+            layer = np.pad(np.rot90(backdrop, k=rot), pad_width=pad_width,
+                           mode='constant', constant_values=ord('*'))
+            # Rotate board cell ids, then invert: id -> position in rotated board
+            cell_ids = np.rot90(np.arange(backdrop.size).reshape(backdrop.shape), k=rot)
+            ys, xs = np.indices(cell_ids.shape)
+            index = np.empty((2, backdrop.size), dtype=np.intp)
+            index[0, cell_ids.ravel()] = ys.ravel() + WEST_VIEW
+            index[1, cell_ids.ravel()] = xs.ravel() + BACKWARD_VIEW
+            layers[direction] = (layer, index.reshape((2,) + backdrop.shape))
+        _STATIC_LAYERS[size] = layers
+    return layers
+
+
+def preload():
+    """
+    Build lookup tables and static layers of every level once in the current process.
+    """
+    rgb_table()
+    for size in range(len(LEVELS)):
+        _static_layers(size)
+
+
 class LaserTag(gym.Env):
     metadata = {'render.modes': ['human']}
 
-    def __init__(self):
+    def __init__(self, incremental=False):
         row = WEST_VIEW + EAST_VIEW + 1
         col = BACKWARD_VIEW + FORWARD_VIEW + 1
 
@@ -26,29 +74,105 @@ class LaserTag(gym.Env):
         self.observation_space = spaces.Box(low=0, high=255, shape=(row, col, 3), dtype=np.uint8)
 
         self._obs = None
+        self._board = None
         self.viewer = None
+        self._renderer = None
+
+        # Opt-in episode statistics, see `enable_stats`
+        self.stats = None
+
+        # Incremental observation mode, see `_incremental_observation`
+        self.incremental = incremental
+        self._static = None
+        self._views = {1: None, 2: None}
+        self.obs_rebuilds = 0
+        self.obs_patches = 0
 
         # info
         self._prev_frame = 0
     
     def step(self, action):
+        obs, reward, done, respawned = self._play(action)
+
+        info = None
+        if respawned.any():
+            info = {"tag_interval_length": self._tag_interval_length()}
+
+        partial_obs = self._partial_observations(obs)
+        rgb_obs = (self._obs_to_rgb(partial_obs[0]), self._obs_to_rgb(partial_obs[1]))
+        return rgb_obs, reward, done, info
+
+    def step_batched(self, action):
+        """
+        Same as `step`, but batched over players for policy inference.
+
+        `action` is an int array of shape (2,) holding player '1' and '2' actions.
+        Returns a C-contiguous uint8 observation of shape (2, row, col, 3),
+        an int8 reward of shape (2,), `done` and an `INFO_DTYPE` record.
+        """
+        action = np.asarray(action)
+        assert action.shape == (2,), "Action shape must be (2,), got {}".format(action.shape)
+        obs, reward, done, respawned = self._play({'1': int(action[0]), '2': int(action[1])})
+
+        info = np.zeros((), dtype=INFO_DTYPE)
+        info['respawned'] = respawned
+        if respawned.any():
+            info['tag_interval_length'] = self._tag_interval_length()
+
+        batched_obs = np.empty((2,) + self.observation_space.shape, dtype=np.uint8)
+        for idx, partial_obs in enumerate(self._partial_observations(obs)):
+            batched_obs[idx] = self._obs_to_rgb(partial_obs)
+        return batched_obs, np.asarray(reward, dtype=np.int8), done, info
+
+    def _play(self, action):
+        """
+        Advance the game by one step.
+        Returns raw board, reward, done and respawn flags of both players.
+        """
         (obs, _), reward, _ = self.game.play(action)
         done = self.game.game_over
         if reward is None:
             reward = np.array([0, 0])
 
-        info = None
-        if (self.game.things['1'].is_respawned == True or
-            self.game.things['2'].is_respawned == True):
-            info = {"tag_interval_length": self.game.things['1']._frame - self._prev_frame}
-            self._prev_frame = self.game.things['1']._frame
+        respawned = np.array([self.game.things['1'].is_respawned == True,
+                              self.game.things['2'].is_respawned == True])
+
+        if self.stats is not None:
+            self._record_stats(done, respawned)
 
         # Save for rendering before converting obs to player's partial obs
+        self._board = obs
         self._obs = self._obs_to_rgb(obs)
+        return obs, reward, done, respawned
 
-        partial_obs = (self.make_observation(obs, 1), self.make_observation(obs, 2))
-        rgb_obs = (self._obs_to_rgb(partial_obs[0]), self._obs_to_rgb(partial_obs[1]))
-        return rgb_obs, reward, done, info
+    def enable_stats(self, stats=None):
+        """
+        Feed game events of every following episode into `stats`.
+        Statistics take effect from the next `reset`.
+        """
+        if stats is None:
+            stats = EpisodeStats()
+        self.stats = stats
+        return stats
+
+    def _record_stats(self, done, respawned):
+        things = self.game.things
+        lasers = (things['r'], things['b'])
+        # Sprite frame counter already counts the `its_showtime` update
+        steps = things['1']._frame - 1
+        self.stats.record_step(
+            fired=(lasers[0].fired, lasers[1].fired),
+            hit=(lasers[0].hit, lasers[1].hit),
+            respawned=respawned,
+            steps=steps)
+        self.stats.record_positions(things['1'].position, things['2'].position)
+        if done:
+            self.stats.end_episode(steps)
+
+    def _tag_interval_length(self):
+        tag_interval_length = self.game.things['1']._frame - self._prev_frame
+        self._prev_frame = self.game.things['1']._frame
+        return tag_interval_length
     
     def seed(self, seed=None):
         np.random.seed(seed)
@@ -56,11 +180,23 @@ class LaserTag(gym.Env):
     def reset(self):
         self.game = make_game()
         (obs, _), _, _ = self.game.its_showtime()
+        return self._reset_observation(obs, size=0)
+
+    def _reset_observation(self, obs, size):
+        if self.stats is not None:
+            self.stats.begin_episode(size)
+            self.stats.record_positions(self.game.things['1'].position,
+                                        self.game.things['2'].position)
+
+        if self.incremental:
+            self._static = _static_layers(size)
+            self._views = {1: None, 2: None}
 
         # Save for rendering before converting obs to player's partial obs
+        self._board = obs
         self._obs = self._obs_to_rgb(obs)
 
-        partial_obs = (self.make_observation(obs, 1), self.make_observation(obs, 2))
+        partial_obs = self._partial_observations(obs)
         rgb_obs = (self._obs_to_rgb(partial_obs[0]), self._obs_to_rgb(partial_obs[1]))
         return rgb_obs
     
@@ -70,9 +206,11 @@ class LaserTag(gym.Env):
             return img
         elif mode == 'human':
             from gym.envs.classic_control import rendering
+            from lasertag.envs.rendering import Renderer
             if self.viewer is None:
                 self.viewer = rendering.SimpleImageViewer()
-            img = self._repeat_upsample(img, 64, 64)
+                self._renderer = Renderer(scale=64)
+            img = self._renderer.render_board(self._board)
             self.viewer.imshow(img)
             if close:
                 self.viewer.close()
@@ -83,6 +221,67 @@ class LaserTag(gym.Env):
             self.viewer.close()
             self.viewer = None
 
+    def _partial_observations(self, obs):
+        if not self.incremental:
+            return self.make_observation(obs, 1), self.make_observation(obs, 2)
+        cells = self._dynamic_cells()
+        return (self._incremental_observation(obs, 1, cells),
+                self._incremental_observation(obs, 2, cells))
+
+    def _dynamic_cells(self):
+        """
+        Board cells that may differ from the static layer:
+        players, direction markers and lasers.
+        """
+        things = self.game.things
+        cells = [things['1'].position, things['2'].position]
+        for player, direction_chr in (('1', 'R'), ('2', 'B')):
+            y, x = things[player].position
+            dy, dx = things[direction_chr].directions
+            cells.append((y + dy, x + dx))
+        cells.extend(things['r'].lasers)
+        cells.extend(things['b'].lasers)
+        ys, xs = zip(*cells)
+        return np.array(ys), np.array(xs)
+
+    def _incremental_observation(self, obs, player, cells):
+        """
+        Same as `make_observation`, but patched from the cached static layer.
+        Only `cells` and cells changed since the last step are written.
+        Falls back to `make_observation` when player rotated or respawned.
+        """
+        row, col = self.observation_space.shape[:2]
+        sprite = self.game.things['{}'.format(player)]
+        direction = self._find_direction(obs, player)
+        layer, index = self._static[direction]
+
+        # Top-left corner of player's view in the static layer
+        y, x = index[:, sprite.position[0], sprite.position[1]]
+        origin = (y - WEST_VIEW, x - BACKWARD_VIEW)
+        static_view = layer[origin[0]: origin[0] + row, origin[1]: origin[1] + col]
+
+        ys = index[0][cells] - origin[0]
+        xs = index[1][cells] - origin[1]
+        visible = (ys >= 0) & (ys < row) & (xs >= 0) & (xs < col)
+        ys, xs, values = ys[visible], xs[visible], obs[cells][visible]
+
+        prev = self._views[player]
+        if prev is None or prev['direction'] != direction or sprite.is_respawned:
+            view = np.array(self.make_observation(obs, player))
+            self.obs_rebuilds += 1
+        else:
+            view = prev['view']
+            if prev['origin'] == origin:
+                view[prev['ys'], prev['xs']] = static_view[prev['ys'], prev['xs']]
+            else:
+                view[...] = static_view
+            view[ys, xs] = values
+            self.obs_patches += 1
+
+        self._views[player] = {'direction': direction, 'origin': origin,
+                               'view': view, 'ys': ys, 'xs': xs}
+        return view
+
     def make_observation(self, obs, player):
         """
         Convert raw observation to player's partial view observation.
@@ -93,6 +292,30 @@ class LaserTag(gym.Env):
         partial_obs = self._partial_obs(padded_obs, player)
         return partial_obs
 
+    @property
+    def board(self):
+        """
+        Current ascii board of shape (height, width), as last returned by the game.
+        """
+        return self._board
+
+    def view_cone(self, player):
+        """
+        Returns player's partial view as a (top, left, bottom, right) rectangle
+        in board coordinates, bottom and right exclusive. May exceed the board.
+        """
+        position = self.game.things['{}'.format(player)].position
+        direction = self._find_direction(self._board, player)
+        rows, cols = [], []
+        for pos, d, extent in ((position[0], direction[0], rows), (position[1], direction[1], cols)):
+            if d == 0:
+                extent += [pos - WEST_VIEW, pos + EAST_VIEW + 1]
+            elif d > 0:
+                extent += [pos - BACKWARD_VIEW, pos + FORWARD_VIEW + 1]
+            else:
+                extent += [pos - FORWARD_VIEW, pos + BACKWARD_VIEW + 1]
+        return rows[0], cols[0], rows[1], cols[1]
+
     def _find_player(self, obs, player):
         player_ascii = ord('{}'.format(player))
         player_arr = (obs == player_ascii)
@@ -165,86 +388,39 @@ class LaserTag(gym.Env):
         partial_obs = obs[y_start: y_end, x_start: x_end] # (y, x, rgb)
         return partial_obs
 
-    def _colour_to_rgb(self, c):
-        """
-        Convert pycolab's COLOURS(0~999) to RGB(0~255)
-        """
-        c = tuple(int(element * 255 / 999) for element in c)
-        return c
-    
     def _obs_to_rgb(self, obs):
         """
         Convert observation with ascii code to observation with RGB channel
         """
-        colours = {key: self._colour_to_rgb(value) for key, value in COLOURS.items()}
-        new_obs = np.array(
-            [[colours[chr(ascii_code)] for ascii_code in row] for row in obs], dtype=np.uint8
-        )
-        return new_obs
-
-    def _repeat_upsample(self, rgb_array, k=1, l=1, err=[]):
-        """
-        This code is borrowed from https://github.com/openai/gym/issues/550
-
-        Necessary for rendering. The size of map for LaserTag is very small.
-        We should upsample image for rendering.
-        """
-        # repeat kinda crashes if k/l are zero
-        if k <= 0 or l <= 0: 
-            if not err: 
-                print("Number of repeats must be larger than 0, k: {}, l: {}, returning default array!".format(k, l))
-                err.append('logged')
-            return rgb_array
-
-        # repeat the pixels k times along the y axis and l times along the x axis
-        # if the input image is of shape (m,n,3), the output image will be of shape (k*m, l*n, 3)
-        return np.repeat(np.repeat(rgb_array, k, axis=0), l, axis=1)
+        return rgb_table()[obs]
 
 
 class LaserTag_small2(LaserTag):
     metadata = {'render.modes': ['human']}
-    def __init__(self):
-        super(LaserTag_small2, self).__init__()
+    def __init__(self, incremental=False):
+        super(LaserTag_small2, self).__init__(incremental=incremental)
     
     def reset(self):
         self.game = make_game(size=0)
         (obs, _), _, _ = self.game.its_showtime()
-
-        # Save for rendering before converting obs to player's partial obs
-        self._obs = self._obs_to_rgb(obs)
-
-        partial_obs = (self.make_observation(obs, 1), self.make_observation(obs, 2))
-        rgb_obs = (self._obs_to_rgb(partial_obs[0]), self._obs_to_rgb(partial_obs[1]))
-        return rgb_obs
+        return self._reset_observation(obs, size=0)
 
 class LaserTag_small3(LaserTag):
     metadata = {'render.modes': ['human']}
-    def __init__(self):
-        super(LaserTag_small3, self).__init__()
+    def __init__(self, incremental=False):
+        super(LaserTag_small3, self).__init__(incremental=incremental)
     
     def reset(self):
         self.game = make_game(size=1)
         (obs, _), _, _ = self.game.its_showtime()
-
-        # Save for rendering before converting obs to player's partial obs
-        self._obs = self._obs_to_rgb(obs)
-
-        partial_obs = (self.make_observation(obs, 1), self.make_observation(obs, 2))
-        rgb_obs = (self._obs_to_rgb(partial_obs[0]), self._obs_to_rgb(partial_obs[1]))
-        return rgb_obs
+        return self._reset_observation(obs, size=1)
 
 class LaserTag_small4(LaserTag):
     metadata = {'render.modes': ['human']}
-    def __init__(self):
-        super(LaserTag_small4, self).__init__()
+    def __init__(self, incremental=False):
+        super(LaserTag_small4, self).__init__(incremental=incremental)
     
     def reset(self):
         self.game = make_game(size=2)
         (obs, _), _, _ = self.game.its_showtime()
-
-        # Save for rendering before converting obs to player's partial obs
-        self._obs = self._obs_to_rgb(obs)
-
-        partial_obs = (self.make_observation(obs, 1), self.make_observation(obs, 2))
-        rgb_obs = (self._obs_to_rgb(partial_obs[0]), self._obs_to_rgb(partial_obs[1]))
-        return rgb_obs
\ No newline at end of file
+        return self._reset_observation(obs, size=2)
@@ -0,0 +1,179 @@
+"""
+Headless rendering of LaserTag boards.
+
+Does not depend on gym or any display, so that episodes can be dumped to
+video on CPU-only machines. Only the example below uses gym, to create the env.
+
+    env = gym.make('LaserTag-small2-v0')
+    renderer = Renderer(scale=8, view_cones=True)
+    with VideoSink('episode.mp4', fps=30) as sink:
+        env.reset()
+        done = False
+        sink.write(renderer.render(env))
+        while not done:
+            _, _, done, _ = env.step(action)
+            sink.write(renderer.render(env))
+"""
+import shutil
+import subprocess
+
+import numpy as np
+
+from lasertag.envs.game_implementation import rgb_table
+
+# Pre-scaled tile atlases, keyed by scale.
+_ATLASES = {}
+
+
+def tile_atlas(scale):
+    """
+    Returns (256, scale, scale, 3) uint8 atlas holding one pre-scaled tile per ascii code.
+    """
+    atlas = _ATLASES.get(scale)
+    if atlas is None:
+        assert scale > 0, "Scale must be larger than 0, got {}".format(scale)
+        table = rgb_table()
+        atlas = np.ascontiguousarray(
+            np.broadcast_to(table[:, None, None, :], (256, scale, scale, 3)))
+        _ATLASES[scale] = atlas
+    return atlas
+
+
+class Renderer(object):
+    """
+    Upsamples ascii boards to RGB frames through a pre-scaled tile atlas.
+
+    scale: side of a board cell in pixels.
+    view_cones: if True, `render` outlines both players' partial views.
+    """
+
+    def __init__(self, scale=8, view_cones=False):
+        self.scale = scale
+        self.view_cones = view_cones
+        self._atlas = tile_atlas(scale)
+        self._thickness = max(1, scale // 8)
+
+    def render(self, env):
+        """
+        Render current board of a `LaserTag` env, wrapped (e.g. by `gym.make`) or not.
+        """
+        cones = ()
+        if self.view_cones:
+            cones = ((env.view_cone(1), '1'), (env.view_cone(2), '2'))
+        return self.render_board(env.board, cones)
+
+    def render_board(self, board, cones=()):
+        """
+        Render ascii board of shape (H, W) to uint8 frame of shape (H * scale, W * scale, 3).
+
+        cones: sequence of ((top, left, bottom, right), character). Each rectangle,
+               given in board cells, is outlined with the colour of `character`.
+        """
+        height, width = board.shape
+        s = self.scale
+        # (H, W, s, s, 3) -> (H, s, W, s, 3) -> (H * s, W * s, 3)
+        frame = self._atlas[board].transpose(0, 2, 1, 3, 4).reshape(height * s, width * s, 3)
+        for rect, character in cones:
+            self._outline(frame, rect, rgb_table()[ord(character)])
+        return frame
+
+    def _outline(self, frame, rect, colour):
+        """
+        Draw rectangle border clipped to the frame.
+        """
+        top, left, bottom, right = (v * self.scale for v in rect)
+        t = self._thickness
+        height, width = frame.shape[:2]
+        y0, y1 = max(top, 0), min(bottom, height)
+        x0, x1 = max(left, 0), min(right, width)
+        if y0 >= y1 or x0 >= x1:
+            return
+        if top >= 0:
+            frame[top: top + t, x0: x1] = colour
+        if bottom <= height:
+            frame[bottom - t: bottom, x0: x1] = colour
+        if left >= 0:
+            frame[y0: y1, left: left + t] = colour
+        if right <= width:
+            frame[y0: y1, right - t: right] = colour
+
+
+class RawFrameSink(object):
+    """
+    Appends raw uint8 RGB frames to a binary file, one frame at a time.
+
+    Frames can be read back with
+    `np.fromfile(path, np.uint8).reshape(-1, height, width, 3)`.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self.shape = None
+        self.num_frames = 0
+
+    def write(self, frame):
+        if self.shape is None:
+            self.shape = frame.shape
+        assert frame.shape == self.shape, "Frame shape changed: {} -> {}".format(self.shape, frame.shape)
+        self._file.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+        self.num_frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class VideoSink(object):
+    """
+    Streams uint8 RGB frames to a video file through an `ffmpeg` subprocess.
+
+    `ffmpeg` is started on the first frame, when the frame size is known.
+    """
+
+    def __init__(self, path, fps=30, ffmpeg='ffmpeg', extra_args=('-pix_fmt', 'yuv420p')):
+        self._ffmpeg = shutil.which(ffmpeg)
+        if self._ffmpeg is None:
+            raise RuntimeError("VideoSink requires `{}` on PATH. Use RawFrameSink instead.".format(ffmpeg))
+        self.path = path
+        self.fps = fps
+        self.extra_args = list(extra_args)
+        self.shape = None
+        self.num_frames = 0
+        self._proc = None
+
+    def _start(self, shape):
+        height, width = shape[:2]
+        args = [self._ffmpeg, '-y', '-loglevel', 'error',
+                '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                '-s', '{}x{}'.format(width, height), '-r', str(self.fps),
+                '-i', '-',
+                # yuv420p needs even frame size
+                '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2'] + self.extra_args + [self.path]
+        self._proc = subprocess.Popen(args, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        if self._proc is None:
+            self.shape = frame.shape
+            self._start(frame.shape)
+        assert frame.shape == self.shape, "Frame shape changed: {} -> {}".format(self.shape, frame.shape)
+        self._proc.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+        self.num_frames += 1
+
+    def close(self):
+        if self._proc is not None:
+            self._proc.stdin.close()
+            retcode = self._proc.wait()
+            self._proc = None
+            if retcode != 0:
+                raise RuntimeError("ffmpeg exited with code {} while writing {}".format(retcode, self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
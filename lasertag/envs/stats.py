@@ -0,0 +1,147 @@
+"""
+Streaming episode statistics for LaserTag.
+
+All counters live in fixed-size numpy arrays, so memory does not grow with
+the number of episodes. Accumulators from different envs or processes
+(e.g. pickled and sent back to a parent) are combined with `merge`.
+
+    stats = env.enable_stats()
+    ...
+    summary = stats.summary()
+"""
+import numpy as np
+
+from lasertag.envs.game_implementation import LEVELS, NUM_FRAMES
+
+# Histogram bins for time to first tag, in steps. The last bin also holds later tags.
+FIRST_TAG_BIN = 50
+NUM_FIRST_TAG_BINS = NUM_FRAMES // FIRST_TAG_BIN + 1
+
+_MAX_HEIGHT = max(len(level) for level in LEVELS)
+_MAX_WIDTH = max(len(level[0]) for level in LEVELS)
+
+
+class EpisodeStats(object):
+    """
+    Fixed-memory accumulator of per-episode game events.
+
+    Per player (index 0 is player '1', index 1 is player '2'):
+        beams:    number of beams fired
+        tags:     number of beams that hit the opponent
+        respawns: number of times the player was tagged out and respawned
+    Per level:
+        episodes:  number of episodes, including ones cut short by an early reset
+        truncated: number of episodes cut short by an early reset
+        frames:    number of steps played in those episodes
+        occupancy: (2, height, width) visit counts of each player
+    Time to first tag of an episode, by either player:
+        first_tag_count, first_tag_sum, first_tag_min, first_tag_max and
+        first_tag_hist with bins of FIRST_TAG_BIN steps. A tag on the first
+        step after reset counts as 1.
+    """
+
+    def __init__(self):
+        num_levels = len(LEVELS)
+        self.beams = np.zeros(2, dtype=np.int64)
+        self.tags = np.zeros(2, dtype=np.int64)
+        self.respawns = np.zeros(2, dtype=np.int64)
+        self.episodes = np.zeros(num_levels, dtype=np.int64)
+        self.truncated = np.zeros(num_levels, dtype=np.int64)
+        self.frames = np.zeros(num_levels, dtype=np.int64)
+        self.occupancy = np.zeros((num_levels, 2, _MAX_HEIGHT, _MAX_WIDTH), dtype=np.int64)
+        self.first_tag_count = 0
+        self.first_tag_sum = 0
+        self.first_tag_min = np.iinfo(np.int64).max
+        self.first_tag_max = 0
+        self.first_tag_hist = np.zeros(NUM_FIRST_TAG_BINS, dtype=np.int64)
+
+        # Current episode. Events are ignored while no episode is running.
+        self._level = None
+        self._tagged = False
+        self._steps = 0
+
+    def begin_episode(self, level):
+        # Env was reset before `done`: close out the running episode,
+        # so that per-episode and per-frame rates stay consistent.
+        if self._level is not None:
+            self.truncated[self._level] += 1
+            self.end_episode(self._steps)
+        self._level = level
+        self._tagged = False
+        self._steps = 0
+
+    def end_episode(self, steps):
+        if self._level is None:
+            return
+        self.episodes[self._level] += 1
+        self.frames[self._level] += steps
+        self._level = None
+
+    def record_step(self, fired, hit, respawned, steps):
+        """
+        fired, hit, respawned: pairs of booleans for player '1' and '2'.
+        steps: number of steps since reset, including this one.
+        """
+        if self._level is None:
+            return
+        self._steps = steps
+        self.beams += fired
+        self.tags += hit
+        self.respawns += respawned
+        if not self._tagged and (hit[0] or hit[1]):
+            self._tagged = True
+            self.first_tag_count += 1
+            self.first_tag_sum += steps
+            self.first_tag_min = min(self.first_tag_min, steps)
+            self.first_tag_max = max(self.first_tag_max, steps)
+            self.first_tag_hist[min(steps // FIRST_TAG_BIN, NUM_FIRST_TAG_BINS - 1)] += 1
+
+    def record_positions(self, position_1, position_2):
+        if self._level is None:
+            return
+        occupancy = self.occupancy[self._level]
+        occupancy[0, position_1[0], position_1[1]] += 1
+        occupancy[1, position_2[0], position_2[1]] += 1
+
+    def merge(self, other):
+        """
+        Add counters of `other` into this accumulator. Returns self.
+        """
+        self.beams += other.beams
+        self.tags += other.tags
+        self.respawns += other.respawns
+        self.episodes += other.episodes
+        self.truncated += other.truncated
+        self.frames += other.frames
+        self.occupancy += other.occupancy
+        self.first_tag_count += other.first_tag_count
+        self.first_tag_sum += other.first_tag_sum
+        self.first_tag_min = min(self.first_tag_min, other.first_tag_min)
+        self.first_tag_max = max(self.first_tag_max, other.first_tag_max)
+        self.first_tag_hist += other.first_tag_hist
+        return self
+
+    def summary(self):
+        """
+        Returns a snapshot of all counters and derived rates.
+        Arrays are copies, so the snapshot does not change with later episodes.
+        """
+        hit_rate = np.where(self.beams > 0, self.tags / np.maximum(self.beams, 1), np.nan)
+        first_tag_mean = (self.first_tag_sum / self.first_tag_count
+                          if self.first_tag_count else float('nan'))
+        return {
+            'episodes': self.episodes.copy(),
+            'truncated': self.truncated.copy(),
+            'frames': self.frames.copy(),
+            'beams': self.beams.copy(),
+            'tags': self.tags.copy(),
+            'hit_rate': hit_rate,
+            'respawns': self.respawns.copy(),
+            'first_tag_count': self.first_tag_count,
+            'first_tag_mean': first_tag_mean,
+            'first_tag_min': self.first_tag_min if self.first_tag_count else None,
+            'first_tag_max': self.first_tag_max if self.first_tag_count else None,
+            'first_tag_hist': self.first_tag_hist.copy(),
+            'occupancy': [self.occupancy[idx, :, :len(level), :len(level[0])].copy()
+                          for idx, level in enumerate(LEVELS)],
+        }
@@ -2,6 +2,9 @@ from setuptools import setup
 
 setup(name='lasertag',
       version='1.0.0',
+      packages=['lasertag', 'lasertag.envs'],
       install_requires=['gym',
-                        'pycolab']
-)  
\ No newline at end of file
+                        'pycolab'],
+      # gym loads these plugins on import; `__root__` keeps ids without a namespace
+      entry_points={'gym.envs': ['__root__ = lasertag:register_envs']}
+)